@@ -0,0 +1,132 @@
+# PlayerBatch must step exactly like Player.update at dt=1; these drive both side by side.
+import os
+import sys
+
+import numpy as np
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import Game  # noqa: E402
+
+# Held-key sets both implementations are driven with, in PlayerBatch.step's argument order
+KEYS = {
+    'left': Game.pygame.K_LEFT,
+    'right': Game.pygame.K_RIGHT,
+    'jump': Game.pygame.K_SPACE,
+    'drop': Game.pygame.K_s,
+}
+
+
+@pytest.fixture(scope="module", autouse=True)
+def runtime():
+    # Asset and level paths are relative to the repository root
+    cwd = os.getcwd()
+    os.chdir(ROOT)
+    Game.start_runtime(headless=True)
+    yield
+    os.chdir(cwd)
+
+
+def make_players(count, start, abilities):
+    players = []
+    for _ in range(count):
+        player = Game.Player(0, 0)
+        player.set_position(*start)
+        player.set_abilities(abilities)
+        players.append(player)
+    return players
+
+
+def player_state(player):
+    return tuple(getattr(player.rect, name) if name in ('x', 'y') else getattr(player, name)
+                 for name in Game.PLAYER_BATCH_STATE)
+
+
+def batch_state(batch, i):
+    return tuple(getattr(batch, name)[i] for name in Game.PLAYER_BATCH_STATE)
+
+
+def step_both(players, batch, grid, held):
+    # One tick of both implementations; returns the players whose state diverged
+    for player, row in zip(players, held):
+        keys = Game.PressedKeys(key for key, down in zip(KEYS.values(), row) if down)
+        player.update(grid, (0, 0), keys)
+    batch.step(*held.T)
+    return [i for i, player in enumerate(players) if player_state(player) != batch_state(batch, i)]
+
+
+def floors():
+    # Abilities carry over from earlier floors, as they do in play
+    params = []
+    levels = Game.LevelStore(os.path.join(ROOT, Game.LEVELS_DIR), os.path.join(ROOT, Game.LEVEL_CACHE_DIR))
+    abilities = {}
+    for level_index in range(len(levels)):
+        abilities = {**abilities, **levels[level_index].get('abilities', {})}
+        params.append(pytest.param(levels[level_index], level_index, abilities, id=f"floor-{level_index + 1}"))
+    return params
+
+
+@pytest.mark.parametrize("level_data, level_index, abilities", floors())
+def test_random_held_keys_match(level_data, level_index, abilities, count=64, ticks=600):
+    # Each player changes one of its keys now and then, so presses are held for a while
+    inputs = np.random.default_rng(level_index)
+    level = Game.Level(level_data, level_index)
+    grid = level.collision_index()
+    players = make_players(count, level.player_start, abilities)
+    batch = Game.PlayerBatch(count, level.platforms, level.player_start, abilities)
+    held = np.zeros((count, len(KEYS)), dtype=bool)
+    mismatches = []
+    for tick in range(ticks):
+        held ^= inputs.random((count, len(KEYS))) < 0.08
+        mismatches.extend((tick, i) for i in step_both(players, batch, grid, held))
+    assert mismatches == []
+
+
+def test_drop_through():
+    # Stand on a drop platform, press drop, and fall through it onto the solid floor below
+    platforms = Game.PlatformSet([(100, 300, 200, 20, False), (0, 500, 800, 40, True)])
+    grid = Game.PlatformGrid(platforms)
+    start = (180, 250)
+    players = make_players(1, start, {})
+    batch = Game.PlayerBatch(1, platforms, start)
+    held = np.zeros((1, len(KEYS)), dtype=bool)
+    for _ in range(20):
+        assert step_both(players, batch, grid, held) == []
+    assert batch.on_drop_platform[0] and batch.y[0] == 300 - batch.height
+
+    held[0, 3] = True
+    assert step_both(players, batch, grid, held) == []
+    assert batch.dropping[0] and batch.drop_timer[0] == 9
+
+    # Holding drop does not restart the timer; the player passes the platform and lands on the floor
+    for _ in range(40):
+        assert step_both(players, batch, grid, held) == []
+    assert batch.drop_timer[0] == 0 and not batch.dropping[0]
+    assert batch.on_ground[0] and not batch.on_drop_platform[0]
+    assert batch.y[0] == 500 - batch.height
+
+
+@pytest.mark.parametrize("abilities, air_jumps", [({'jump': True}, 0), ({'jump': True, 'double_jump': True}, 1)])
+def test_double_jump(abilities, air_jumps):
+    # Jump, release, then press again in the air: only double_jump gives the second boost, and only once
+    platforms = Game.PlatformSet([(0, 500, 800, 40, True)])
+    grid = Game.PlatformGrid(platforms)
+    start = (380, 460)
+    players = make_players(1, start, abilities)
+    batch = Game.PlayerBatch(1, platforms, start, abilities)
+    held = np.zeros((1, len(KEYS)), dtype=bool)
+    assert step_both(players, batch, grid, held) == []
+    assert batch.on_ground[0]
+
+    boosts = 0
+    for tick in range(60):
+        held[0, 2] = tick in (0, 6, 12)
+        before = batch.vel_y[0]
+        assert step_both(players, batch, grid, held) == []
+        if tick in (6, 12) and batch.vel_y[0] < before:
+            assert batch.vel_y[0] == Game.JUMP_STRENGTH * 0.85 + Game.GRAVITY
+            boosts += 1
+    assert boosts == air_jumps
+    assert not batch.can_double_jump[0]
@@ -3,8 +3,11 @@ import sys
 import math
 import json
 import random
+from collections import OrderedDict
 from enum import Enum
 
+import numpy as np
+
 # Initialize Pygame
 pygame.init()
 
@@ -54,6 +57,67 @@ KEY_GOLD = (255, 243, 80)
 SHADOW_COLOR = (35, 15, 25)
 WARM_WHITE = (255, 253, 245)
 
+# Background wave settings
+SKY_WAVE_FREQUENCY = 0.005  # radians per row
+SKY_WAVE_SPEED = 0.00003  # radians per millisecond
+SKY_WAVE_AMPLITUDE = 20
+
+def prepare_surface(surface):
+    # Match the display pixel format once a window exists so blits stay on the fast path
+    if pygame.display.get_surface() is None:
+        return surface
+    if surface.get_flags() & pygame.SRCALPHA:
+        return surface.convert_alpha()
+    return surface.convert()
+
+class WarmSkyLayer:
+    # The sky is a static base gradient plus a sine wave that slowly scrolls down the rows.
+    # Both parts are rendered once; each frame only picks the strip offset for the current
+    # time and recomposes when that offset moves by a whole row.
+    def __init__(self, size):
+        self.size = size
+        self.period = int(math.ceil(2 * math.pi / SKY_WAVE_FREQUENCY))
+        self.base = None
+        self.wave_strip = None
+        self.composite = None
+        self.wave_rows = None
+        self.offset = None
+
+    def build(self):
+        width, height = self.size
+        # The wave adds up to +/-30 red and +/-14 green, so the base is lowered by that much
+        # and the strip stores the wave shifted into the positive range for BLEND_ADD
+        wave_floor = (int(SKY_WAVE_AMPLITUDE * 1.5), int(SKY_WAVE_AMPLITUDE * 0.7), 0)
+        base = pygame.Surface((1, height))
+        for y in range(height):
+            y_ratio = y / height
+            color = [int(WARM_NIGHT[i] * (1 - y_ratio) + SUNSET_PURPLE[i] * y_ratio) - wave_floor[i]
+                     for i in range(3)]
+            base.set_at((0, y), color)
+        strip = pygame.Surface((1, height + self.period))
+        for row in range(height + self.period):
+            wave = math.sin(row * SKY_WAVE_FREQUENCY) * SKY_WAVE_AMPLITUDE
+            strip.set_at((0, row), (int(wave * 1.5) + wave_floor[0], int(wave * 0.7) + wave_floor[1], 0))
+        self.base = prepare_surface(pygame.transform.scale(base, self.size))
+        self.wave_strip = strip
+        self.composite = prepare_surface(pygame.Surface(self.size))
+        self.wave_rows = pygame.Surface(self.size)
+
+    def get(self, ticks):
+        if self.base is None:
+            self.build()
+        phase = (ticks * SKY_WAVE_SPEED) % (2 * math.pi)
+        offset = int(phase / SKY_WAVE_FREQUENCY)
+        if offset != self.offset:
+            self.offset = offset
+            rows = self.wave_strip.subsurface((0, offset, 1, self.size[1]))
+            pygame.transform.scale(rows, self.size, self.wave_rows)
+            self.composite.blit(self.base, (0, 0))
+            self.composite.blit(self.wave_rows, (0, 0), special_flags=pygame.BLEND_ADD)
+        return self.composite
+
+warm_sky = WarmSkyLayer((SCREEN_WIDTH, SCREEN_HEIGHT))
+
 class GameState(Enum):
     MENU = 1
     PLAYING = 2
@@ -73,36 +137,117 @@ class TransitionState:
         self.start_level = 0
         self.direction = 1  # 1 for forward, -1 for backward
 
-class Particle:
-    def __init__(self, x, y, color_palette=None, vel_x=None, vel_y=None):
-        self.x = x
-        self.y = y
-        self.vx = vel_x if vel_x is not None else random.uniform(-0.5, 0.5)
-        self.vy = vel_y if vel_y is not None else random.uniform(-1, -0.5)
-        self.life = 1.0
-        self.size = random.randint(2, 5)
-        if color_palette:
-            self.color = random.choice(color_palette)
-        else:
-            self.color = random.choice([MOLTEN_GOLD, FIRE_ORANGE, WARM_PINK])
-        
+class SpriteAtlas:
+    # Least recently used sprites are dropped once the atlas holds `capacity` entries
+    def __init__(self, capacity=256):
+        self.capacity = capacity
+        self.sprites = OrderedDict()
+
+    def get(self, key, builder):
+        sprite = self.sprites.get(key)
+        if sprite is not None:
+            self.sprites.move_to_end(key)
+            return sprite
+        sprite = prepare_surface(builder())
+        self.sprites[key] = sprite
+        if len(self.sprites) > self.capacity:
+            self.sprites.popitem(last=False)
+        return sprite
+
+sprite_atlas = SpriteAtlas()
+
+TEXT_CACHE_CAPACITY = 128
+
+text_atlas = SpriteAtlas(TEXT_CACHE_CAPACITY)
+
+def render_text(font, text, color, antialias=True):
+    return text_atlas.get(('text', font, text, color, antialias), lambda: font.render(text, antialias, color))
+
+PARTICLE_ALPHA_QUANTUM = 8
+PARTICLE_GLOW_LAYERS = 3
+DEFAULT_PARTICLE_PALETTE = [MOLTEN_GOLD, FIRE_ORANGE, WARM_PINK]
+
+def build_particle_glow(size, color, alpha):
+    # Three discs growing by 2px and fading with each layer, blended over each other
+    outer = size + (PARTICLE_GLOW_LAYERS - 1) * 2
+    sprite = pygame.Surface((outer * 2, outer * 2), pygame.SRCALPHA)
+    for i in range(PARTICLE_GLOW_LAYERS):
+        glow_size = size + i * 2
+        layer = pygame.Surface((glow_size * 2, glow_size * 2), pygame.SRCALPHA)
+        pygame.draw.circle(layer, (*color, alpha // (i + 1)), (glow_size, glow_size), glow_size)
+        sprite.blit(layer, (outer - glow_size, outer - glow_size))
+    return sprite
+
+class ParticlePool:
+    # Glowing particles stored as parallel arrays; live particles occupy the first `count` slots
+    def __init__(self, capacity=128, gravity=0.02):
+        self.capacity = capacity
+        self.gravity = gravity
+        self.count = 0
+        self.x = np.zeros(capacity)
+        self.y = np.zeros(capacity)
+        self.vx = np.zeros(capacity)
+        self.vy = np.zeros(capacity)
+        self.life = np.zeros(capacity)
+        self.size = np.zeros(capacity, dtype=np.int32)
+        self.color = np.zeros(capacity, dtype=np.int32)
+        self.colors = []  # Palette entries referenced by self.color
+
+    def __len__(self):
+        return self.count
+
+    def color_index(self, color):
+        if color not in self.colors:
+            self.colors.append(color)
+        return self.colors.index(color)
+
+    def emit(self, x, y, color_palette=None, vel_x=None, vel_y=None):
+        if self.count >= self.capacity:
+            return
+        i = self.count
+        self.x[i] = x
+        self.y[i] = y
+        self.vx[i] = vel_x if vel_x is not None else random.uniform(-0.5, 0.5)
+        self.vy[i] = vel_y if vel_y is not None else random.uniform(-1, -0.5)
+        self.life[i] = 1.0
+        self.size[i] = random.randint(2, 5)
+        self.color[i] = self.color_index(random.choice(color_palette or DEFAULT_PARTICLE_PALETTE))
+        self.count += 1
+
     def update(self):
-        self.x += self.vx
-        self.y += self.vy
-        self.life -= 0.02
-        self.vy += 0.02  # Slight gravity
-        
+        n = self.count
+        if n == 0:
+            return
+        self.x[:n] += self.vx[:n]
+        self.y[:n] += self.vy[:n]
+        self.life[:n] -= 0.02
+        self.vy[:n] += self.gravity  # Slight gravity
+
+        alive = self.life[:n] > 0
+        live = int(np.count_nonzero(alive))
+        if live != n:
+            for column in (self.x, self.y, self.vx, self.vy, self.life, self.size, self.color):
+                column[:live] = column[:n][alive]
+            self.count = live
+
     def draw(self, surface):
-        if self.life > 0:
-            alpha = int(255 * self.life)
-            # Add glow effect
-            for i in range(3):
-                glow_alpha = alpha // (i + 1)
-                glow_size = self.size + i * 2
-                glow_surf = pygame.Surface((glow_size * 2, glow_size * 2), pygame.SRCALPHA)
-                color = (*self.color, glow_alpha)
-                pygame.draw.circle(glow_surf, color, (glow_size, glow_size), glow_size)
-                surface.blit(glow_surf, (self.x - glow_size, self.y - glow_size))
+        n = self.count
+        if n == 0:
+            return
+        alphas = (255 * self.life[:n]).astype(np.int32)
+        alphas -= alphas % PARTICLE_ALPHA_QUANTUM
+        sizes = self.size[:n]
+        outer = sizes + (PARTICLE_GLOW_LAYERS - 1) * 2
+        xs = (self.x[:n] - outer).astype(np.int32).tolist()
+        ys = (self.y[:n] - outer).astype(np.int32).tolist()
+        keys = list(zip(sizes.tolist(), self.color[:n].tolist(), alphas.tolist()))
+        sprites = {}
+        for key in set(keys):
+            size, color, alpha = key
+            color = self.colors[color]
+            sprites[key] = sprite_atlas.get(('particle', size, color, alpha),
+                                            lambda: build_particle_glow(size, color, alpha))
+        surface.blits([(sprites[key], (x, y)) for key, x, y in zip(keys, xs, ys)], doreturn=False)
 
 class Fireball:
     def __init__(self, x, y, target_x, target_y):
@@ -117,14 +262,13 @@ class Fireball:
         else:
             self.vel_x = 10
             self.vel_y = 0
-        self.particles = []
+        # Trail of 3 a tick living 50 ticks, plus the 25 of the explosion
+        self.particles = ParticlePool(capacity=192)
         self.alive = True
         self.life = 60  # frames
         
     def update(self, platforms, breakable_boxes):
-        for particle in self.particles:
-            particle.update()
-        self.particles = [p for p in self.particles if p.life > 0]
+        self.particles.update()
 
         if not self.alive:
             return
@@ -153,12 +297,10 @@ class Fireball:
                 
         # Create fire trail
         for _ in range(3):
-            self.particles.append(
-                Particle(self.rect.centerx + random.randint(-5, 5),
-                       self.rect.centery + random.randint(-5, 5),
-                       [FIRE_ORANGE, CRIMSON, MOLTEN_GOLD, EMBER_RED],
-                       random.uniform(-1, 1), random.uniform(-1, 1))
-            )
+            self.particles.emit(self.rect.centerx + random.randint(-5, 5),
+                                self.rect.centery + random.randint(-5, 5),
+                                [FIRE_ORANGE, CRIMSON, MOLTEN_GOLD, EMBER_RED],
+                                random.uniform(-1, 1), random.uniform(-1, 1))
             
         # Out of bounds
         if (self.rect.x < -50 or self.rect.x > SCREEN_WIDTH + 50 or
@@ -171,16 +313,13 @@ class Fireball:
         for _ in range(25):
             angle = random.uniform(0, math.pi * 2)
             speed = random.uniform(2, 6)
-            self.particles.append(
-                Particle(self.rect.centerx, self.rect.centery,
-                       [FIRE_ORANGE, CRIMSON, MOLTEN_GOLD, EMBER_RED],
-                       math.cos(angle) * speed, math.sin(angle) * speed)
-            )
+            self.particles.emit(self.rect.centerx, self.rect.centery,
+                                [FIRE_ORANGE, CRIMSON, MOLTEN_GOLD, EMBER_RED],
+                                math.cos(angle) * speed, math.sin(angle) * speed)
             
     def draw(self, screen):
         # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
+        self.particles.draw(screen)
             
         if self.alive:
             # Draw fireball with glow
@@ -200,7 +339,7 @@ class BreakableBox:
         self.rect = pygame.Rect(x, y, 40, 40)
         self.has_key = has_key
         self.broken = False
-        self.particles = []
+        self.particles = ParticlePool()
         self.key_collected = False
         self.key_y_offset = 0
         self.key_float_phase = random.uniform(0, math.pi * 2)
@@ -212,18 +351,14 @@ class BreakableBox:
             for _ in range(20):
                 angle = random.uniform(0, math.pi * 2)
                 speed = random.uniform(2, 6)
-                self.particles.append(
-                    Particle(self.rect.centerx, self.rect.centery,
-                           [WARM_BROWN, SUNSET_BROWN, TERRACOTTA],
-                           math.cos(angle) * speed, 
-                           math.sin(angle) * speed - 3)
-                )
+                self.particles.emit(self.rect.centerx, self.rect.centery,
+                                    [WARM_BROWN, SUNSET_BROWN, TERRACOTTA],
+                                    math.cos(angle) * speed,
+                                    math.sin(angle) * speed - 3)
                 
     def update(self):
         # Update particles
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
+        self.particles.update()
             
         # Float key animation
         if self.broken and self.has_key and not self.key_collected:
@@ -238,8 +373,7 @@ class BreakableBox:
         
     def draw(self, screen):
         # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
+        self.particles.draw(screen)
             
         if not self.broken:
             # Draw box with wood texture
@@ -330,7 +464,7 @@ class Player:
         self.color = WARM_CYAN
         self.glow_color = SPRING_GREEN
         self.trail = []
-        self.particles = []
+        self.particles = ParticlePool(capacity=256)
         
         # Abilities
         self.abilities = abilities or {}
@@ -366,11 +500,9 @@ class Player:
                 self.can_double_jump = self.double_jump_available
                 # Jump particles
                 for _ in range(12):
-                    self.particles.append(
-                        Particle(self.rect.centerx + random.randint(-10, 10), 
-                               self.rect.bottom,
-                               [WARM_CYAN, SPRING_GREEN, MINT_GREEN])
-                    )
+                    self.particles.emit(self.rect.centerx + random.randint(-10, 10),
+                                        self.rect.bottom,
+                                        [WARM_CYAN, SPRING_GREEN, MINT_GREEN])
             elif self.can_double_jump:
                 self.vel_y = JUMP_STRENGTH * 0.85
                 self.can_double_jump = False
@@ -379,12 +511,10 @@ class Player:
                 for _ in range(20):
                     angle = random.uniform(0, math.pi * 2)
                     speed = random.uniform(3, 5)
-                    self.particles.append(
-                        Particle(self.rect.centerx, self.rect.centery,
-                               [MOLTEN_GOLD, FIRE_ORANGE, WARM_PINK],
-                               math.cos(angle) * speed,
-                               math.sin(angle) * speed)
-                    )
+                    self.particles.emit(self.rect.centerx, self.rect.centery,
+                                        [MOLTEN_GOLD, FIRE_ORANGE, WARM_PINK],
+                                        math.cos(angle) * speed,
+                                        math.sin(angle) * speed)
                 """
                     
         self.jump_pressed = jump_key
@@ -422,9 +552,7 @@ class Player:
             self.trail.pop(0)
             
         # Update particles
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
+        self.particles.update()
             
         # Update fireballs
         self.fireballs = [f for f in self.fireballs if f.alive or len(f.particles) > 0]
@@ -447,19 +575,16 @@ class Player:
                         # Landing particles
                         if abs(self.vel_y) > 5:
                             for _ in range(5):
-                                self.particles.append(
-                                    Particle(self.rect.centerx + random.randint(-15, 15), 
-                                           self.rect.bottom,
-                                           [WARM_CYAN, SPRING_GREEN, MINT_GREEN])
-                                )
+                                self.particles.emit(self.rect.centerx + random.randint(-15, 15),
+                                                    self.rect.bottom,
+                                                    [WARM_CYAN, SPRING_GREEN, MINT_GREEN])
                     else:
                         self.rect.top = platform.bottom
                         self.vel_y = 0
                         
     def draw(self, screen):
         # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
+        self.particles.draw(screen)
             
         # Draw fireballs
         for fireball in self.fireballs:
@@ -530,7 +655,8 @@ class Door:
         self.label = label
         self.color = DOOR_BURGUNDY
         self.glow_timer = 0
-        self.particles = []
+        # Magical particles float upward
+        self.particles = ParticlePool(gravity=0.02 - 0.1)
         self.locked = False
         
     def update(self):
@@ -538,21 +664,15 @@ class Door:
         
         # Spawn magical particles
         if random.random() < 0.1:
-            self.particles.append(
-                Particle(self.rect.centerx + random.randint(-20, 20),
-                       self.rect.y + random.randint(0, self.rect.height),
-                       [DOOR_GOLD, FIRE_ORANGE, WARM_PINK])
-            )
+            self.particles.emit(self.rect.centerx + random.randint(-20, 20),
+                                self.rect.y + random.randint(0, self.rect.height),
+                                [DOOR_GOLD, FIRE_ORANGE, WARM_PINK])
         
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
-            particle.vy -= 0.1  # Float upward
+        self.particles.update()
         
     def draw(self, screen, font):
         # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
+        self.particles.draw(screen)
             
         # Draw door glow with warm colors
         glow_surf = pygame.Surface((self.rect.width + 60, self.rect.height + 60), pygame.SRCALPHA)
@@ -614,14 +734,77 @@ class Door:
             
         # Draw label
         if self.label:
-            label_text = font.render(self.label, True, WARM_WHITE)
+            label_text = render_text(font, self.label, WARM_WHITE)
             label_x = self.rect.centerx - label_text.get_width() // 2
             label_y = self.rect.y - 25
             # Label background
-            label_bg = pygame.Surface((label_text.get_width() + 10, label_text.get_height() + 4), pygame.SRCALPHA)
-            pygame.draw.rect(label_bg, (*SHADOW_COLOR, 180), (0, 0, label_text.get_width() + 10, label_text.get_height() + 4), border_radius=3)
+            label_size = label_text.get_size()
+            label_bg = text_atlas.get(('label_bg', label_size), lambda: self.build_label_background(label_size))
             screen.blit(label_bg, (label_x - 5, label_y - 2))
             screen.blit(label_text, (label_x, label_y))
+            
+    def build_label_background(self, text_size):
+        label_bg = pygame.Surface((text_size[0] + 10, text_size[1] + 4), pygame.SRCALPHA)
+        pygame.draw.rect(label_bg, (*SHADOW_COLOR, 180), (0, 0, text_size[0] + 10, text_size[1] + 4), border_radius=3)
+        return label_bg
+
+# --- Light Map ---
+LIGHT_MAP_SCALE = 4  # Lights accumulate at quarter resolution and are upscaled once
+LIGHT_RADIUS_STEP = 8  # Flickering radii snap to prebuilt falloff textures this many pixels apart
+LIGHT_COLOR = (255, 253, 245)
+
+def build_bulb_glow():
+    glow_surf = pygame.Surface((80, 80), pygame.SRCALPHA)
+    for i in range(20):
+        alpha = 100 - i * 5
+        color = (*MOLTEN_GOLD, alpha)
+        pygame.draw.ellipse(glow_surf, color, 
+                          (i, i, 80 - i*2, 80 - i*2))
+    return glow_surf
+
+def build_light_falloff(radius, color):
+    # Under BLEND_MULT only the colour of the old alpha rings ever reached the screen, so the
+    # falloff is a solid disc; black outside it leaves the ambient untouched under BLEND_MAX
+    size = radius * 2 + 2
+    texture = pygame.Surface((size, size))
+    pygame.draw.circle(texture, color, (radius + 1, radius + 1), radius)
+    return texture
+
+class LightMap:
+    def __init__(self, size, ambient, blend):
+        width, height = size
+        self.size = size
+        self.ambient = ambient
+        self.blend = blend
+        self.buffer = prepare_surface(pygame.Surface((width // LIGHT_MAP_SCALE, height // LIGHT_MAP_SCALE)))
+        self.light_map = prepare_surface(pygame.Surface(size))
+        self.ambient_map = prepare_surface(pygame.Surface(size))
+        self.ambient_map.fill(ambient)
+        self.sources_key = None
+        self.rebuilds = 0
+        
+    def quantize(self, source):
+        x, y, radius, color = source
+        radius = int(round(radius / LIGHT_RADIUS_STEP)) * LIGHT_RADIUS_STEP
+        return (int(x) // LIGHT_MAP_SCALE, int(y) // LIGHT_MAP_SCALE, radius // LIGHT_MAP_SCALE, color)
+        
+    def compose(self, surface, lights):
+        sources = [source for source in (light.emission() for light in lights) if source is not None]
+        if not sources:
+            # Nothing to accumulate, only the flat ambient term
+            surface.blit(self.ambient_map, (0, 0), special_flags=self.blend)
+            return
+        
+        key = tuple(self.quantize(source) for source in sources)
+        if key != self.sources_key:
+            self.sources_key = key
+            self.rebuilds += 1
+            self.buffer.fill(self.ambient)
+            for x, y, radius, color in key:
+                texture = sprite_atlas.get(('light', radius, color), lambda: build_light_falloff(radius, color))
+                self.buffer.blit(texture, (x - radius - 1, y - radius - 1), special_flags=pygame.BLEND_MAX)
+            pygame.transform.scale(self.buffer, self.size, self.light_map)
+        surface.blit(self.light_map, (0, 0), special_flags=self.blend)
 
 class Light:
     def __init__(self, x, y):
@@ -629,7 +812,7 @@ class Light:
         self.y = y
         self.radius = 650
         self.flicker_timer = random.uniform(0, math.pi * 2)
-        self.particles = []
+        self.particles = ParticlePool(capacity=64)
         self.color_phase = random.uniform(0, math.pi * 2)
         
     def update(self):
@@ -642,14 +825,12 @@ class Light:
             dist = random.uniform(0, 40)
             px = self.x + math.cos(angle) * dist
             py = self.y + math.sin(angle) * dist
-            self.particles.append(Particle(px, py))
+            self.particles.emit(px, py)
         """
         # Update particles
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
+        self.particles.update()
         
-    def draw(self, screen, light_surface):
+    def draw(self, screen):
         # Draw hanging wire with sway
         sway = math.sin(self.flicker_timer * 0.3) * 5
         for i in range(3):
@@ -662,12 +843,7 @@ class Light:
         bulb_rect = pygame.Rect(self.x - 15 + sway, self.y - 20, 30, 40)
         
         # Bulb glow
-        glow_surf = pygame.Surface((80, 80), pygame.SRCALPHA)
-        for i in range(20):
-            alpha = 100 - i * 5
-            color = (*MOLTEN_GOLD, alpha)
-            pygame.draw.ellipse(glow_surf, color, 
-                              (i, i, 80 - i*2, 80 - i*2))
+        glow_surf = sprite_atlas.get(('bulb_glow',), build_bulb_glow)
         screen.blit(glow_surf, (self.x - 40 + sway, self.y - 40))
         
         # Bulb base
@@ -680,43 +856,13 @@ class Light:
         pygame.draw.rect(screen, WARM_GRAY, cap_rect, border_radius=2)
         
         # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
+        self.particles.draw(screen)
         
-        # Create very warm light gradient
+    def emission(self):
+        # Very warm light; flicker only picks a different prebuilt falloff radius
+        sway = math.sin(self.flicker_timer * 0.3) * 5
         flicker = math.sin(self.flicker_timer) * 15 + math.sin(self.flicker_timer * 3) * 7
-        current_radius = self.radius + flicker
-        
-        center_x = self.x + sway
-        center_y = self.y
-        
-        # Extra warm light gradient
-        for r in range(int(current_radius), 0, -300):
-            distance_ratio = r / current_radius
-            alpha = int(255 * (1 - distance_ratio) ** 1.5)
-            
-            # Very warm color gradient
-            if distance_ratio < 1.2:
-                # Core: bright warm white
-                color = (255, 253, 245, alpha)
-            """
-            elif distance_ratio < 0.6:
-                # Middle: golden orange
-                color_ratio = (distance_ratio - 0.3) / 0.3
-                r_val = 255
-                g_val = int(253 - color_ratio * 60)
-                b_val = int(245 - color_ratio * 165)
-                color = (r_val, g_val, b_val, alpha)
-            else:
-                # Outer: deep orange-red
-                color_ratio = (distance_ratio - 0.6) / 0.4
-                r_val = 255
-                g_val = int(193 - color_ratio * 120)
-                b_val = int(80 - color_ratio * 80)
-                color = (r_val, g_val, b_val, alpha)
-            """
-            pygame.draw.circle(light_surface, color, 
-                             (int(center_x), int(center_y)), r)
+        return (self.x + sway, self.y, self.radius + flicker, LIGHT_COLOR)
 
 class Level:
     def __init__(self, level_data, level_number):
@@ -827,25 +973,9 @@ class Level:
                 player.keys -= 1
         
     def draw_background(self, screen):
-        # Draw extra warm gradient background
-        for y in range(SCREEN_HEIGHT):
-            # Multi-layer gradient for depth
-            time_offset = pygame.time.get_ticks() * 0.00003
-            y_ratio = y / SCREEN_HEIGHT
-            
-            # Base gradient from warm night to sunset purple
-            base_r = int(WARM_NIGHT[0] * (1 - y_ratio) + SUNSET_PURPLE[0] * y_ratio)
-            base_g = int(WARM_NIGHT[1] * (1 - y_ratio) + SUNSET_PURPLE[1] * y_ratio)
-            base_b = int(WARM_NIGHT[2] * (1 - y_ratio) + SUNSET_PURPLE[2] * y_ratio)
-            
-            # Add warm orange waves
-            wave = math.sin(time_offset + y * 0.005) * 20
-            r = max(0, min(255, base_r + int(wave * 1.5)))
-            g = max(0, min(255, base_g + int(wave * 0.7)))
-            b = max(0, min(255, base_b))
-            
-            pygame.draw.line(screen, (r, g, b), (0, y), (SCREEN_WIDTH, y))
-        
+        # Draw extra warm gradient background with slowly moving orange waves
+        screen.blit(warm_sky.get(pygame.time.get_ticks()), (0, 0))
+
         # Draw stars with warm twinkling
         for star in self.stars:
             brightness = (math.sin(star['twinkle']) + 1) * 0.5
@@ -913,7 +1043,7 @@ class Menu:
             'quit': pygame.Rect(SCREEN_WIDTH//2 - 150, 450, 300, 70)
         }
         self.hover = None
-        self.particles = []
+        self.particles = ParticlePool()
         self.bg_phase = 0
         
     def update(self):
@@ -924,16 +1054,12 @@ class Menu:
                 self.hover = name
                 # Add particles on hover
                 if random.random() < 0.4:
-                    self.particles.append(
-                        Particle(rect.centerx + random.randint(-50, 50),
-                               rect.centery,
-                               [MOLTEN_GOLD, FIRE_ORANGE, CORAL])
-                    )
+                    self.particles.emit(rect.centerx + random.randint(-50, 50),
+                                        rect.centery,
+                                        [MOLTEN_GOLD, FIRE_ORANGE, CORAL])
         
         # Update particles
-        self.particles = [p for p in self.particles if p.life > 0]
-        for particle in self.particles:
-            particle.update()
+        self.particles.update()
             
         self.bg_phase += 0.01
                 
@@ -981,8 +1107,7 @@ class Menu:
             screen.blit(orb_surf, (x - size * 2.5, y - size * 2.5))
         
         # Draw particles
-        for particle in self.particles:
-            particle.draw(screen)
+        self.particles.draw(screen)
                 
         # Draw title with intense fire effects
         title = "LIGHT QUEST"
@@ -993,15 +1118,15 @@ class Menu:
             offset = i // 2
             for dx, dy in [(offset, offset), (-offset, offset), (offset, -offset), (-offset, -offset)]:
                 glow_color = (*FIRE_ORANGE, int(alpha))
-                glow_text = self.font_title.render(title, True, glow_color)
+                glow_text = render_text(self.font_title, title, glow_color)
                 screen.blit(glow_text, (SCREEN_WIDTH//2 - glow_text.get_width()//2 + dx, 150 + dy))
         
         # Main title
-        text = self.font_title.render(title, True, WARM_WHITE)
+        text = render_text(self.font_title, title, WARM_WHITE)
         screen.blit(text, (SCREEN_WIDTH//2 - text.get_width()//2, 150))
         
         # Inner highlight
-        highlight = self.font_title.render(title, True, MOLTEN_GOLD)
+        highlight = render_text(self.font_title, title, MOLTEN_GOLD)
         screen.blit(highlight, (SCREEN_WIDTH//2 - highlight.get_width()//2 - 2, 148))
         
         # Draw buttons
@@ -1057,7 +1182,7 @@ class Menu:
             
             # Button text
             text = "START GAME" if name == 'start' else "QUIT"
-            button_text = self.font_button.render(text, True, WARM_WHITE)
+            button_text = render_text(self.font_button, text, WARM_WHITE)
             text_x = rect.x + (rect.width - button_text.get_width()) // 2
             text_y = rect.y + (rect.height - button_text.get_height()) // 2
             screen.blit(button_text, (text_x, text_y))
@@ -1069,6 +1194,58 @@ class Menu:
             return 'quit'
         return None
 
+# --- Transition Snapshots ---
+TRANSITION_SWIPE_SCALE = 0.75
+TRANSITION_SCALE_QUANTUM = 0.0125  # One shrink/grow step, so every frame size maps to one cached copy
+
+def build_transition_shadow(size):
+    shadow_surf = pygame.Surface(size, pygame.SRCALPHA)
+    shadow_surf.fill((SHADOW_COLOR[0], SHADOW_COLOR[1], SHADOW_COLOR[2], 100))
+    return shadow_surf
+
+class TransitionGlow:
+    # One reusable surface for the glow around the growing level: redrawn when the size changes,
+    # faded with set_alpha, so the grow phase neither allocates per frame nor fills the sprite atlas
+    def __init__(self):
+        self.surface = None
+        self.size = None
+
+    def draw(self, screen, size, alpha, pos):
+        area = (0, 0, size[0] + 60, size[1] + 60)
+        if self.surface is None or self.surface.get_width() < area[2] or self.surface.get_height() < area[3]:
+            self.surface = prepare_surface(pygame.Surface((max(area[2], SCREEN_WIDTH + 60),
+                                                           max(area[3], SCREEN_HEIGHT + 60)), pygame.SRCALPHA))
+            self.size = None
+        if size != self.size:
+            self.size = size
+            self.surface.fill((0, 0, 0, 0))
+            pygame.draw.rect(self.surface, FIRE_ORANGE, area, border_radius=30)
+        self.surface.set_alpha(alpha)
+        screen.blit(self.surface, pos, area)
+
+class SnapshotScaler:
+    # Scaled copies of the transition snapshots, made once per distinct size and reused across frames
+    def __init__(self):
+        self.copies = {}
+        
+    def scaled_size(self, scale):
+        scale = round(scale / TRANSITION_SCALE_QUANTUM) * TRANSITION_SCALE_QUANTUM
+        return (int(round(SCREEN_WIDTH * scale)), int(round(SCREEN_HEIGHT * scale)))
+        
+    def get(self, surface, scale):
+        size = self.scaled_size(scale)
+        if surface.get_size() == size:
+            return surface
+        key = (id(surface), size)
+        scaled = self.copies.get(key)
+        if scaled is None:
+            scaled = pygame.transform.smoothscale(surface, size)
+            self.copies[key] = scaled
+        return scaled
+        
+    def clear(self):
+        self.copies.clear()
+
 class Game:
     def __init__(self):
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
@@ -1080,13 +1257,16 @@ class Game:
         self.levels = self.load_levels()
         self.level = None
         self.player = None
-        # Create light surface with per-pixel alpha
-        self.light_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
         self.ambient_light = 40  # Warmer ambient light
+        self.light_map = LightMap((SCREEN_WIDTH, SCREEN_HEIGHT), (self.ambient_light,) * 3, pygame.BLEND_MULT)
         self.font = pygame.font.Font(None, 36)
         self.small_font = pygame.font.Font(None, 20)
         self.transition = TransitionState()
         self.level_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.snapshots = SnapshotScaler()
+        self.transition_glow = TransitionGlow()
+        self.level_thumbnails = {}  # level index -> swipe-scale snapshot of its starting state
+        self.thumbnail_job = None
         
     def load_levels(self):
         # Level data structure
@@ -1188,21 +1368,15 @@ class Game:
         self.transition.old_level_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
         self.draw_level_to_surface(self.transition.old_level_surface)
         
-        # Capture intermediate level surfaces
+        # Intermediate level thumbnails are normally warmed up while playing
+        self.snapshots.clear()
         self.transition.intermediate_surfaces = []
         if abs(target_level - self.current_level) > 1:
             # Going through multiple levels
             start = min(self.current_level, target_level) + 1
             end = max(self.current_level, target_level)
             for i in range(start, end):
-                # Temporarily load each intermediate level
-                temp_level = Level(self.levels[i], i)
-                temp_player = Player(*temp_level.player_start, temp_level.player_abilities)
-                
-                # Draw to surface
-                intermediate_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
-                self.draw_intermediate_level_to_surface(intermediate_surface, temp_level, temp_player)
-                self.transition.intermediate_surfaces.append(intermediate_surface)
+                self.transition.intermediate_surfaces.append(self.level_thumbnail(i))
                 
             # Reverse the list if going backwards
             if self.transition.direction < 0:
@@ -1222,6 +1396,32 @@ class Game:
         self.transition.offset_x = 0
         self.state = GameState.TRANSITIONING
         
+    def level_thumbnail(self, level_index):
+        if level_index not in self.level_thumbnails:
+            for _ in self.build_level_thumbnail(level_index):
+                pass
+        return self.level_thumbnails[level_index]
+        
+    def build_level_thumbnail(self, level_index):
+        # Generator so warming can spread drawing and scaling over separate frames
+        temp_level = Level(self.levels[level_index], level_index)
+        temp_player = Player(*temp_level.player_start, temp_level.player_abilities)
+        intermediate_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT))
+        self.draw_intermediate_level_to_surface(intermediate_surface, temp_level, temp_player)
+        yield
+        size = self.snapshots.scaled_size(TRANSITION_SWIPE_SCALE)
+        self.level_thumbnails[level_index] = pygame.transform.smoothscale(intermediate_surface, size)
+        
+    def warm_level_thumbnails(self):
+        # Advance one step of one missing thumbnail per frame so a later transition never has to
+        if self.thumbnail_job is None:
+            missing = [i for i in range(len(self.levels)) if i not in self.level_thumbnails]
+            if not missing:
+                return
+            self.thumbnail_job = self.build_level_thumbnail(missing[0])
+        if next(self.thumbnail_job, StopIteration) is StopIteration:
+            self.thumbnail_job = None
+        
     def draw_intermediate_level_to_surface(self, surface, level, player):
         # Similar to draw_level_to_surface but for temporary levels
         level.draw_background(surface)
@@ -1236,10 +1436,9 @@ class Game:
         player.draw(surface)
         
         # Apply lighting
-        self.light_surface.fill((*[self.ambient_light] * 3, 255))
         for light in level.lights:
-            light.draw(surface, self.light_surface)
-        surface.blit(self.light_surface, (0, 0), special_flags=pygame.BLEND_MULT)
+            light.draw(surface)
+        self.light_map.compose(surface, level.lights)
         
     def draw_level_to_surface(self, surface):
         # Draw the current level to a surface
@@ -1257,10 +1456,9 @@ class Game:
         self.player.draw(surface)
         
         # Apply lighting
-        self.light_surface.fill((*[self.ambient_light] * 3, 255))
         for light in self.level.lights:
-            light.draw(surface, self.light_surface)
-        surface.blit(self.light_surface, (0, 0), special_flags=pygame.BLEND_MULT)
+            light.draw(surface)
+        self.light_map.compose(surface, self.level.lights)
         
     def update_transition(self):
         speed = 0.05
@@ -1299,24 +1497,22 @@ class Game:
         
         if self.transition.phase == "shrink":
             # Draw old level shrinking
-            scaled_size = (int(SCREEN_WIDTH * self.transition.scale), 
-                          int(SCREEN_HEIGHT * self.transition.scale))
-            scaled_surface = pygame.transform.smoothscale(self.transition.old_level_surface, scaled_size)
+            scaled_surface = self.snapshots.get(self.transition.old_level_surface, self.transition.scale)
+            scaled_size = scaled_surface.get_size()
             
             # Center the scaled surface
             x = (SCREEN_WIDTH - scaled_size[0]) // 2
             y = (SCREEN_HEIGHT - scaled_size[1]) // 2
             
             # Add warm shadow effect
-            shadow_surf = pygame.Surface(scaled_size, pygame.SRCALPHA)
-            shadow_surf.fill((SHADOW_COLOR[0], SHADOW_COLOR[1], SHADOW_COLOR[2], 100))
+            shadow_surf = sprite_atlas.get(('transition_shadow', scaled_size), lambda: build_transition_shadow(scaled_size))
             self.screen.blit(shadow_surf, (x + 10, y + 10))
             
             self.screen.blit(scaled_surface, (x, y))
             
         elif self.transition.phase == "swipe":
             # All levels at 75% scale
-            scaled_size = (int(SCREEN_WIDTH * 0.75), int(SCREEN_HEIGHT * 0.75))
+            scaled_size = self.snapshots.scaled_size(TRANSITION_SWIPE_SCALE)
             y = (SCREEN_HEIGHT - scaled_size[1]) // 2
             
             # Calculate which levels to show based on offset
@@ -1344,14 +1540,13 @@ class Game:
             
             # Draw all visible surfaces
             for surface, x_pos in surfaces_to_draw:
-                scaled = pygame.transform.smoothscale(surface, scaled_size)
+                scaled = self.snapshots.get(surface, TRANSITION_SWIPE_SCALE)
                 self.screen.blit(scaled, (x_pos, y))
                 
         elif self.transition.phase == "grow":
             # Draw new level growing
-            scaled_size = (int(SCREEN_WIDTH * self.transition.scale), 
-                          int(SCREEN_HEIGHT * self.transition.scale))
-            scaled_surface = pygame.transform.smoothscale(self.transition.new_level_surface, scaled_size)
+            scaled_surface = self.snapshots.get(self.transition.new_level_surface, self.transition.scale)
+            scaled_size = scaled_surface.get_size()
             
             # Center the scaled surface
             x = (SCREEN_WIDTH - scaled_size[0]) // 2
@@ -1359,11 +1554,7 @@ class Game:
             
             # Add intense warm glow effect as it grows
             glow_alpha = int(255 * (1 - self.transition.progress) * 0.4)
-            glow_surf = pygame.Surface((scaled_size[0] + 60, scaled_size[1] + 60), pygame.SRCALPHA)
-            pygame.draw.rect(glow_surf, (*FIRE_ORANGE, glow_alpha), 
-                           (0, 0, scaled_size[0] + 60, scaled_size[1] + 60), 
-                           border_radius=30)
-            self.screen.blit(glow_surf, (x - 30, y - 30))
+            self.transition_glow.draw(self.screen, scaled_size, glow_alpha, (x - 30, y - 30))
             
             self.screen.blit(scaled_surface, (x, y))
             
@@ -1374,6 +1565,7 @@ class Game:
             mouse_pos = pygame.mouse.get_pos()
             self.player.update(self.level.platforms, mouse_pos)
             self.level.update(self.player)
+            self.warm_level_thumbnails()
                 
             # Check door collisions
             for door in self.level.doors:
@@ -1399,39 +1591,44 @@ class Game:
                 pygame.draw.line(self.screen, FIRE_ORANGE, (mouse_x - 15, mouse_y), (mouse_x + 15, mouse_y), 2)
                 pygame.draw.line(self.screen, FIRE_ORANGE, (mouse_x, mouse_y - 15), (mouse_x, mouse_y + 15), 2)
             
-            # Draw UI
-            ui_surf = pygame.Surface((350, 130), pygame.SRCALPHA)
-            pygame.draw.rect(ui_surf, (*SHADOW_COLOR, 180), (0, 0, 350, 130), border_radius=10)
-            pygame.draw.rect(ui_surf, (*PEACH_GLOW, 100), (0, 0, 350, 130), 2, border_radius=10)
-            
-            level_text = self.font.render(f"Level {self.current_level + 1}", True, WARM_WHITE)
-            ui_surf.blit(level_text, (10, 10))
-            
-            # Show abilities
-            ability_y = 45
-            if self.player.abilities.get('double_jump'):
-                ability_text = self.small_font.render("Double Jump: Jump while in air", True, MOLTEN_GOLD)
-                ui_surf.blit(ability_text, (10, ability_y))
-                ability_y += 25
-                
-            if self.player.abilities.get('fireball'):
-                ability_text = self.small_font.render("Fireball: F or Shift (aim with mouse)", True, FIRE_ORANGE)
-                ui_surf.blit(ability_text, (10, ability_y))
-                ability_y += 25
-                
-            # Show keys
-            if self.player.keys > 0:
-                key_text = self.small_font.render(f"Keys: {self.player.keys}", True, KEY_GOLD)
-                ui_surf.blit(key_text, (10, ability_y))
-            
-            controls_text = self.small_font.render("Arrow Keys/WASD: Move | Space: Jump", True, WARM_WHITE)
-            ui_surf.blit(controls_text, (10, 105))
-            
+            # Draw UI, rebuilt only when what it shows changes
+            ui_key = ('hud', self.current_level, self.player.abilities.get('double_jump'),
+                      self.player.abilities.get('fireball'), self.player.keys)
+            ui_surf = text_atlas.get(ui_key, self.build_hud)
             self.screen.blit(ui_surf, (10, 10))
             
         elif self.state == GameState.TRANSITIONING:
             self.draw_transition()
             
+    def build_hud(self):
+        ui_surf = pygame.Surface((350, 130), pygame.SRCALPHA)
+        pygame.draw.rect(ui_surf, (*SHADOW_COLOR, 180), (0, 0, 350, 130), border_radius=10)
+        pygame.draw.rect(ui_surf, (*PEACH_GLOW, 100), (0, 0, 350, 130), 2, border_radius=10)
+        
+        level_text = self.font.render(f"Level {self.current_level + 1}", True, WARM_WHITE)
+        ui_surf.blit(level_text, (10, 10))
+        
+        # Show abilities
+        ability_y = 45
+        if self.player.abilities.get('double_jump'):
+            ability_text = self.small_font.render("Double Jump: Jump while in air", True, MOLTEN_GOLD)
+            ui_surf.blit(ability_text, (10, ability_y))
+            ability_y += 25
+            
+        if self.player.abilities.get('fireball'):
+            ability_text = self.small_font.render("Fireball: F or Shift (aim with mouse)", True, FIRE_ORANGE)
+            ui_surf.blit(ability_text, (10, ability_y))
+            ability_y += 25
+            
+        # Show keys
+        if self.player.keys > 0:
+            key_text = self.small_font.render(f"Keys: {self.player.keys}", True, KEY_GOLD)
+            ui_surf.blit(key_text, (10, ability_y))
+        
+        controls_text = self.small_font.render("Arrow Keys/WASD: Move | Space: Jump", True, WARM_WHITE)
+        ui_surf.blit(controls_text, (10, 105))
+        return ui_surf
+        
     def handle_event(self, event):
         if event.type == pygame.QUIT:
             return False